@@ -1,6 +1,12 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 import plotly.express as px
 
 # ====================================================================
@@ -14,56 +20,205 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ====================================================================
+# Skema Kolom Data
+# ====================================================================
+# Kolom persentase pada skema EPL bersifat tetap (contoh nilai: "89%").
+PCT_COLS = (
+    'Conversion %', 'Passes%', 'Crosses %', 'fThird Passes %',
+    'gDuels %', 'aDuels %', 'Saves %'
+)
+
+# Semua statistik hitungan muat dalam int16; menit bermain butuh int32.
+NUM_COLS_INT = {
+    col: 'int16' for col in (
+        'Appearances', 'Goals', 'Assists', 'Shots', 'Shots On Target',
+        'Big Chances Missed', 'Hit Woodwork', 'Offsides', 'Touches', 'Passes',
+        'Successful Passes', 'Crosses', 'Successful Crosses', 'fThird Passes',
+        'Successful fThird Passes', 'Through Balls', 'Carries',
+        'Progressive Carries', 'Carries Ended with Goal',
+        'Carries Ended with Assist', 'Carries Ended with Shot',
+        'Carries Ended with Chance', 'Possession Won', 'Dispossessed',
+        'Clean Sheets', 'Clearances', 'Interceptions', 'Blocks', 'Tackles',
+        'Ground Duels', 'gDuels Won', 'Aerial Duels', 'aDuels Won',
+        'Goals Conceded', 'xGoT Conceded', 'Own Goals', 'Fouls',
+        'Yellow Cards', 'Red Cards', 'Saves', 'Penalties Saved',
+        'Clearances Off Line', 'Punches', 'High Claims'
+    )
+}
+NUM_COLS_INT['Minutes'] = 'int32'
+
+# Kategori dan string berbasis Arrow dikirim st.dataframe sebagai buffer
+# Arrow bertipe, bukan objek Python per sel. Pada pandas 3, 'string' sudah
+# berbasis Arrow; penulisan eksplisit 'string[pyarrow]' berpengaruh pada
+# pandas 2. Mengubah skema ini juga mengganti tag cache Parquet.
+CAT_COLS = {
+    'Club': 'category',
+    'Position': 'category',
+    'Nationality': 'category',
+    'Player Name': 'string[pyarrow]'
+}
+
+def _pct(value):
+    """
+    Mengubah string persentase (mis. "89%") menjadi pecahan float (0.89).
+    Sel kosong menjadi NaN.
+    """
+    value = value.strip()
+    if not value:
+        return np.nan
+    return float(value.rstrip('%')) / 100.0
+
+# Naikkan versi ini bila logika pembersihan di load_data berubah. Perubahan
+# skema kolom di atas sudah otomatis menghasilkan tag cache Parquet baru.
+DATA_CACHE_VERSION = 1
+
+def _cache_tag():
+    """Tag pendek dari versi dan skema pembersihan untuk nama file Parquet."""
+    schema = repr((
+        DATA_CACHE_VERSION,
+        PCT_COLS,
+        sorted(NUM_COLS_INT.items()),
+        sorted(CAT_COLS.items())
+    ))
+    return hashlib.sha1(schema.encode()).hexdigest()[:8]
+
 # ====================================================================
 # Fungsi Pemuatan Data dengan Caching
 # ====================================================================
-@st.cache_data
+@st.cache_resource
 def load_data(file_path):
     """
     Memuat data pemain dari file CSV, melakukan pembersihan dasar,
-    dan mengoptimalkan kinerja dengan caching.
+    dan mengoptimalkan kinerja dengan caching. DataFrame yang sama
+    dibagikan ke setiap rerun tanpa disalin, sehingga hanya boleh dibaca.
+    Hasil pembersihan disimpan sebagai Parquet di samping CSV, dengan tag
+    skema pada nama filenya, dan dipakai pada start berikutnya selama masih
+    lebih baru dari CSV-nya. File Parquet yang rusak diabaikan.
     """
+    csv_path = Path(file_path)
+    parquet_path = csv_path.with_suffix(f'.{_cache_tag()}.parquet')
+    if parquet_path.exists() and (
+        not csv_path.exists()
+        or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime
+    ):
+        try:
+            return pd.read_parquet(parquet_path)
+        except (OSError, ValueError):
+            # File terpotong atau tidak valid: muat ulang dari CSV
+            pass
+
     try:
-        df = pd.read_csv(file_path)
-        # Pembersihan data yang lebih kuat: Mengonversi kolom persentase dari string ke float
-        for col in df.columns:
-            if df[col].dtype == 'object' and df[col].str.contains('%', na=False).any():
-                df[col] = df[col].str.replace('%', '', regex=False).astype(float) / 100.0
-        return df
+        try:
+            # Skema eksplisit: tipe data langsung diterapkan oleh parser C dan
+            # kolom persentase dikonversi saat dibaca, tanpa pemindaian ulang.
+            df = pd.read_csv(
+                file_path,
+                dtype={**NUM_COLS_INT, **CAT_COLS},
+                converters={col: _pct for col in PCT_COLS}
+            )
+        except ValueError:
+            # Sel kosong pada kolom hitungan (atau nilai tak terduga) tidak
+            # muat di skema int: baca tanpa skema lalu konversi secara toleran.
+            df = pd.read_csv(file_path)
+            for col in df.columns.intersection(PCT_COLS):
+                pct = df[col].astype('string').str.rstrip('%')
+                df[col] = pd.to_numeric(pct, errors='coerce') / 100.0
+            for col, dtype in CAT_COLS.items():
+                if col in df.columns:
+                    df[col] = df[col].astype(dtype)
+        # Kolom persentase di luar PCT_COLS (jika skema berubah) cukup
+        # dideteksi dari sampel 50 baris pertama, bukan seluruh kolom.
+        sample = df.head(50)
+        pct_cols = [
+            col for col in df.select_dtypes(include=['object', 'string']).columns
+            if sample[col].astype(str).str.endswith('%').any()
+        ]
+        for col in pct_cols:
+            df[col] = df[col].str.rstrip('%').astype('float32').div(100)
+        # Perkecil tipe numerik ke ukuran terkecil yang memuat nilainya
+        for col in df.select_dtypes('number').columns:
+            downcast = 'integer' if pd.api.types.is_integer_dtype(df[col]) else 'float'
+            df[col] = pd.to_numeric(df[col], downcast=downcast)
     except FileNotFoundError:
         st.error(f"File tidak ditemukan di {file_path}. Pastikan file 'epl_player_stats_24_25.csv' ada di direktori yang sama.")
         return None
 
+    # Tulis ke file sementara lalu ganti secara atomik, sehingga proses yang
+    # terhenti atau berjalan bersamaan tidak meninggalkan file setengah jadi.
+    tmp_path = parquet_path.with_name(f'{parquet_path.stem}.tmp{os.getpid()}.parquet')
+    try:
+        df.to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, parquet_path)
+    except OSError:
+        # Direktori hanya-baca: lewati penyimpanan, data tetap dapat dipakai
+        tmp_path.unlink(missing_ok=True)
+        return df
+
+    # Hapus cache dengan tag skema lama; file sementara proses lain dibiarkan
+    for stale_path in csv_path.parent.glob(f'{csv_path.stem}.*.parquet'):
+        tag = stale_path.suffixes[-2][1:]
+        if stale_path != parquet_path and re.fullmatch(r'[0-9a-f]{8}', tag):
+            try:
+                stale_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+    return df
+
 # Memuat data
-df = load_data('epl_player_stats_24_25.csv')
+DATA_FILE = 'epl_player_stats_24_25.csv'
+df = load_data(DATA_FILE)
 
 if df is None:
     st.stop()
 
+# Kolom yang tidak relevan untuk peringkat pemain individu
+METRICS_TO_EXCLUDE = ['Big Chances Missed', 'Hit Woodwork', 'Offsides', 'Goals Conceded', 'Own Goals', 'Yellow Cards', 'Red Cards', 'Penalties Saved']
+
+@st.cache_data(show_spinner=False)
+def filter_options():
+    """
+    Menghitung opsi dari data tanpa filter: daftar klub dan posisi
+    (kategori kolom sudah terurut), batas menit bermain, dan daftar metrik
+    yang dapat diperingkatkan. Tanpa argumen, sehingga dihitung sekali dan
+    tidak diulang di setiap rerun.
+    """
+    df = load_data(DATA_FILE)
+    minutes = df['Minutes'].to_numpy()
+    metrics_to_rank = sorted(
+        col for col in df.select_dtypes(include=np.number).columns
+        if col not in METRICS_TO_EXCLUDE and 'Ended' not in col and 'xGoT' not in col
+    )
+    return (
+        df['Club'].cat.categories.tolist(),
+        ['All'] + df['Position'].cat.categories.tolist(),
+        (int(np.nanmin(minutes)), int(np.nanmax(minutes))),
+        metrics_to_rank
+    )
+
+CLUBS, POSITIONS, (MIN_MINUTES, MAX_MINUTES), METRICS_TO_RANK = filter_options()
+
 # ====================================================================
 # Sidebar untuk Filter
 # ====================================================================
 st.sidebar.header("Panel Filter ⚙️")
 
 # Filter Klub
-clubs = sorted(df['Club'].unique())
 selected_clubs = st.sidebar.multiselect(
     'Pilih Klub:',
-    options=clubs,
+    options=CLUBS,
     default=['Arsenal', 'Manchester City', 'Liverpool', 'Manchester United']
 )
 
 # Filter Posisi
-positions = ['All'] + sorted(df['Position'].unique())
-selected_position = st.sidebar.selectbox('Pilih Posisi:', positions)
+selected_position = st.sidebar.selectbox('Pilih Posisi:', POSITIONS)
 
 # Filter Menit Bermain
-min_minutes, max_minutes = int(df['Minutes'].min()), int(df['Minutes'].max())
 selected_minutes_range = st.sidebar.slider(
     'Filter Menit Bermain:',
-    min_value=min_minutes,
-    max_value=max_minutes,
-    value=(min_minutes, max_minutes)
+    min_value=MIN_MINUTES,
+    max_value=MAX_MINUTES,
+    value=(MIN_MINUTES, MAX_MINUTES)
 )
 
 # ====================================================================
@@ -72,38 +227,120 @@ selected_minutes_range = st.sidebar.slider(
 st.title("⚽ Dasbor Analisis Pemain Premier League 2024/25")
 st.write("Selamat datang di dasbor interaktif untuk menganalisis statistik pemain dari English Premier League. Gunakan panel filter di sebelah kiri untuk menjelajahi data.")
 
+# Tanpa klub terpilih tidak ada yang perlu difilter atau divisualisasikan
+if not selected_clubs:
+    st.info("Pilih setidaknya satu klub.")
+    st.stop()
+
 # ====================================================================
 # Logika Pemfilteran Data
 # ====================================================================
-# Mulai dengan salinan DataFrame yang belum difilter
-filtered_df = df.copy()
+# Semua fungsi ber-cache di bawah menerima FILTER_KEY, tuple kecil berisi
+# (klub terurut, posisi, rentang menit), sebagai kunci cache sehingga
+# Streamlit tidak perlu meng-hash DataFrame pada setiap pemanggilan.
+# Setiap posisi slider menghasilkan kunci baru dan cache berlaku global
+# untuk semua sesi, jadi jumlah entrinya dibatasi.
+FILTER_CACHE_MAX_ENTRIES = 64
 
-# Terapkan filter berdasarkan klub
-if selected_clubs:
-    filtered_df = filtered_df[filtered_df['Club'].isin(selected_clubs)]
-else:
-    # Jika tidak ada klub yang dipilih, tampilkan DataFrame kosong
-    filtered_df = pd.DataFrame(columns=df.columns)
+@st.cache_data(show_spinner=False)
+def club_groups():
+    """
+    Mengelompokkan indeks baris per kode kategori klub. Baris klub ke-c
+    berada di order[split[c]:split[c + 1]].
+    """
+    df = load_data(DATA_FILE)
+    codes = df['Club'].cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    split = np.searchsorted(codes[order], np.arange(len(df['Club'].cat.categories) + 1))
+    return order, split
+
+@st.cache_resource(show_spinner=False, max_entries=FILTER_CACHE_MAX_ENTRIES)
+def get_filtered(key):
+    """
+    Menerapkan filter klub, posisi, dan rentang menit bermain. Baris klub
+    terpilih diambil langsung dari club_groups sehingga mask posisi dan
+    menit hanya dievaluasi pada baris tersebut, lalu DataFrame dipotong
+    sekali. Hasilnya di-cache per kunci filter sehingga kondisi filter
+    yang sama tidak memindai ulang seluruh DataFrame, dan dikembalikan
+    tanpa salinan (hanya untuk dibaca).
+    """
+    clubs, position, mrange = key
+    df = load_data(DATA_FILE)
+    order, split = club_groups()
+    club_codes = df['Club'].cat.categories.get_indexer(clubs)
+    idx = np.sort(np.concatenate(
+        [order[split[c]:split[c + 1]] for c in club_codes if c >= 0]
+        or [np.empty(0, dtype=np.intp)]
+    ))
 
-# Terapkan filter berdasarkan posisi
-if selected_position != 'All':
-    filtered_df = filtered_df[filtered_df['Position'] == selected_position]
+    minutes = df['Minutes'].to_numpy()[idx]
+    conditions = [minutes >= mrange[0], minutes <= mrange[1]]
+    if position != 'All':
+        position_code = df['Position'].cat.categories.get_loc(position)
+        conditions.append(df['Position'].cat.codes.to_numpy()[idx] == position_code)
+    return df.iloc[idx[np.logical_and.reduce(conditions)]]
 
-# Terapkan filter berdasarkan rentang menit bermain
-if not filtered_df.empty:
-    filtered_df = filtered_df[
-        (filtered_df['Minutes'] >= selected_minutes_range[0]) &
-        (filtered_df['Minutes'] <= selected_minutes_range[1])
-    ]
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_MAX_ENTRIES)
+def top_n(key, metric, n=10):
+    """
+    Mengambil n pemain teratas berdasarkan metrik yang dipilih, diurutkan
+    menaik. Seleksi parsial np.partition menghindari pengurutan penuh;
+    nilai seri di batas ke-n diputus seperti nlargest(keep='first'), yaitu
+    baris yang lebih awal didahulukan. Nilai NaN diabaikan.
+    """
+    df = get_filtered(key)
+    values = df[metric].to_numpy(dtype=float)
+    idx = np.flatnonzero(~np.isnan(values))
+    if len(idx) > n:
+        kth = np.partition(values[idx], -n)[-n]
+        idx = idx[values[idx] >= kth]
+    # Urut menaik per nilai; untuk nilai seri baris yang lebih awal berada
+    # di akhir sehingga ikut terambil oleh potongan n terakhir.
+    idx = idx[np.lexsort((-idx, values[idx]))][-n:]
+    return df.iloc[idx]
+
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_MAX_ENTRIES)
+def goals_per_club(key):
+    """Menjumlahkan gol per klub, diurutkan dari yang terbanyak."""
+    df = get_filtered(key)
+    # Club bertipe kategori: observed=True hanya mengelompokkan klub yang
+    # ada di hasil filter, bukan seluruh 20 kategori klub.
+    return df.groupby('Club', observed=True)['Goals'].sum().sort_values(ascending=False)
+
+@st.cache_resource(show_spinner=False, max_entries=FILTER_CACHE_MAX_ENTRIES)
+def table_data(key):
+    """
+    Mengonversi DataFrame hasil filter menjadi tabel Arrow untuk st.dataframe.
+    Tabel Arrow tidak dapat diubah, sehingga objek yang sama aman dipakai
+    ulang antar-rerun tanpa konversi maupun penyalinan ulang.
+    """
+    return pa.Table.from_pandas(get_filtered(key), preserve_index=False)
+
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_MAX_ENTRIES)
+def goals_bar_fig(key):
+    """Membuat grafik batang Plotly total gol per klub."""
+    return px.bar(goals_per_club(key).reset_index(), x='Club', y='Goals')
+
+FILTER_KEY = (
+    tuple(sorted(selected_clubs)),
+    selected_position,
+    tuple(selected_minutes_range)
+)
+filtered_df = get_filtered(FILTER_KEY)
 
 # ====================================================================
 # Tampilan Metrik Kunci (KPI)
 # ====================================================================
 if not filtered_df.empty:
-    total_players = len(filtered_df)
-    total_goals = int(filtered_df['Goals'].sum())
-    avg_assists = round(filtered_df['Assists'].mean(), 2)
-    avg_minutes = round(filtered_df['Minutes'].mean(), 0)
+    # Satu array NumPy untuk ketiga kolom KPI, lalu reduksi per kolom.
+    # Reduksi nan* mengabaikan sel kosong seperti .sum()/.mean() pandas;
+    # kolom yang seluruhnya kosong ditampilkan sebagai 0.
+    vals = filtered_df[['Goals', 'Assists', 'Minutes']].to_numpy(copy=False)
+    has_value = ~np.isnan(vals).all(axis=0)
+    total_players = vals.shape[0]
+    total_goals = int(np.nansum(vals[:, 0]))
+    avg_assists = round(float(np.nanmean(vals[:, 1])), 2) if has_value[1] else 0
+    avg_minutes = round(float(np.nanmean(vals[:, 2])), 0) if has_value[2] else 0
 else:
     total_players = 0
     total_goals = 0
@@ -119,11 +356,13 @@ col4.metric("Rata-rata Menit Bermain", f"{int(avg_minutes):,}")
 st.divider()
 
 # ====================================================================
-# Layout Tab untuk Visualisasi
+# Fungsi Render Tab
 # ====================================================================
-tab1, tab2, tab3 = st.tabs(["Analisis Visual Gabungan", "Peringkat Pemain", "Data Lengkap"])
-
-with tab1:
+# Setiap tab adalah fragment: interaksi widget di dalam satu tab hanya
+# menjalankan ulang tab tersebut, bukan agregasi dan grafik tab lainnya.
+@st.fragment
+def render_tab1(filter_key, filtered_df):
+    """Menampilkan grafik gol per klub dan korelasi tembakan vs. gol."""
     st.header("Analisis Visual Gabungan")
 
     # Peringatan jika tidak ada data
@@ -132,18 +371,22 @@ with tab1:
     else:
         # Grafik 1: Total Gol per Klub
         st.subheader('Total Gol per Klub')
-        goals_by_club = filtered_df.groupby('Club')['Goals'].sum().sort_values(ascending=False)
-        st.bar_chart(goals_by_club)
+        st.plotly_chart(goals_bar_fig(filter_key), use_container_width=True)
 
         # Grafik 2: Analisis Tembakan vs. Gol (Scatter Plot Interaktif)
         st.subheader('Analisis Tembakan vs. Gol')
+        # Hanya kolom yang dipakai grafik yang dikirim ke Plotly; kolom
+        # numeriknya sudah diperkecil saat pemuatan data sehingga payload ringkas.
+        scatter_df = filtered_df[['Shots', 'Goals', 'Club', 'Player Name', 'Position', 'Minutes']]
+        # WebGL merender seluruh titik dalam satu kanvas, bukan node SVG per titik
         fig_scatter = px.scatter(
-            filtered_df,
+            scatter_df,
             x='Shots',
             y='Goals',
             color='Club',
             hover_name='Player Name',
             hover_data=['Position', 'Minutes'],
+            render_mode='webgl',
             title='Korelasi antara Jumlah Tembakan dan Gol'
         )
         fig_scatter.update_layout(
@@ -152,28 +395,24 @@ with tab1:
         )
         st.plotly_chart(fig_scatter, use_container_width=True)
 
-with tab2:
+@st.fragment
+def render_tab2(filter_key, filtered_df):
+    """Menampilkan peringkat 10 pemain teratas untuk metrik yang dipilih."""
     st.header("Peringkat Pemain Unggulan")
 
     if filtered_df.empty:
         st.warning("Tidak ada data untuk ditampilkan pada peringkat.")
     else:
-        # Pilih metrik yang relevan untuk diperingkatkan
-        numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-        # Hapus kolom yang tidak relevan untuk peringkat pemain individu
-        metrics_to_exclude = ['Big Chances Missed', 'Hit Woodwork', 'Offsides', 'Goals Conceded', 'Own Goals', 'Yellow Cards', 'Red Cards', 'Penalties Saved']
-        metrics_to_rank = [col for col in numeric_cols if col not in metrics_to_exclude and 'Ended' not in col and 'xGoT' not in col]
-
         metric_selection = st.selectbox(
             'Pilih Metrik untuk Peringkat:',
-            options=sorted(metrics_to_rank),
-            index=metrics_to_rank.index('Goals') if 'Goals' in metrics_to_rank else 0
+            options=METRICS_TO_RANK,
+            index=METRICS_TO_RANK.index('Goals') if 'Goals' in METRICS_TO_RANK else 0
         )
 
         if metric_selection:
-            top_10_players = filtered_df.nlargest(10, metric_selection)
+            top_10_players = top_n(filter_key, metric_selection)[['Player Name', metric_selection]]
             fig_bar_top = px.bar(
-                top_10_players.sort_values(metric_selection, ascending=True),
+                top_10_players,
                 x=metric_selection,
                 y='Player Name',
                 orientation='h',
@@ -189,15 +428,19 @@ with tab2:
             )
             st.plotly_chart(fig_bar_top, use_container_width=True)
 
-with tab3:
+@st.fragment
+def render_tab3(filter_key, filtered_df):
+    """Menampilkan tabel lengkap data pemain yang sudah difilter."""
     st.header("Data Lengkap Pemain (Difilter)")
     st.info("Anda dapat mengurutkan kolom dengan mengklik headernya atau mencari data di dalam tabel.")
 
     if filtered_df.empty:
         st.warning("Tidak ada data yang cocok dengan filter yang Anda pilih.")
     else:
+        # st.dataframe sudah merender baris secara virtual; yang di-cache
+        # adalah konversi data ke Arrow per kondisi filter.
         st.dataframe(
-            filtered_df,
+            table_data(filter_key),
             column_config={
                 "Passes%": st.column_config.ProgressColumn(
                     "Akurasi Umpan",
@@ -223,3 +466,17 @@ with tab3:
             use_container_width=True,
             hide_index=True
         )
+
+# ====================================================================
+# Layout Tab untuk Visualisasi
+# ====================================================================
+tab1, tab2, tab3 = st.tabs(["Analisis Visual Gabungan", "Peringkat Pemain", "Data Lengkap"])
+
+with tab1:
+    render_tab1(FILTER_KEY, filtered_df)
+
+with tab2:
+    render_tab2(FILTER_KEY, filtered_df)
+
+with tab3:
+    render_tab3(FILTER_KEY, filtered_df)